@@ -1,20 +1,35 @@
 # core.py
+import functools
+import os
 import re
 import sys
 import shutil
 import subprocess
+from collections import deque
 from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple, Iterable
+from typing import Dict, List, Optional, Tuple
 
-import yaml
+
+@functools.lru_cache(maxsize=None)
+def _yaml():
+    """Import PyYAML on first use (shared with gui.py).
+
+    Returns (yaml, Loader, Dumper), preferring the LibYAML C classes."""
+    import yaml
+    try:
+        from yaml import CSafeLoader as loader, CSafeDumper as dumper
+    except ImportError:
+        from yaml import SafeLoader as loader, SafeDumper as dumper
+    return yaml, loader, dumper
 
 
 # ============================================================
 # ---------------------  DATA STRUCTURES  --------------------
 # ============================================================
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TOCEntry:
     level: int   # 2 for H2, 3 for H3, ...
     title: str   # exact text from the TOC
@@ -44,18 +59,49 @@ class TOCStitcherCore:
 
     HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.+?)\s*$", re.MULTILINE)
     DATE_PREFIX = re.compile(r"^(?P<date>\d{8})(?:-(?P<rev>\d+))?_")
-
-    def __init__(self, base_dir: Path, output_filename: Optional[str] = None):
+    NORM_RE = re.compile(r"[^a-z0-9]+")
+    TOKEN_RE = re.compile(r"[a-z0-9]+")
+    SLUG_STRIP_RE = re.compile(r"[^a-z0-9\s-]")
+    SLUG_WS_RE = re.compile(r"\s+")
+    TOC_LINE_RE = re.compile(r"^(\s*)(?:(#{1,6})[ \t]+|-\s+)(.+?)\s*$")   # heading or list item
+    ALNUM_RE = re.compile(r"[A-Za-z0-9]")
+    HRULE_RE = re.compile(r"^[^\S\n]*---[^\S\n]*$", re.MULTILINE)
+    HASHES = ("", "#", "##", "###", "####", "#####", "######")   # index = level
+
+    def __init__(self, base_dir: Path, output_filename: Optional[str] = None,
+                 load: bool = True):
+        """load=False skips reading stitcher_settings.yaml; the caller must
+        call refresh() before building (e.g. on a worker thread)."""
         self.base_dir = Path(base_dir)
         self.toc_file = self.base_dir / "Table_of_Contents.md"
 
+        self._output_filename = output_filename
+        self._toc_raw: Optional[str] = None
+        if load:
+            self.refresh()
+
+        self._exe_cache: Dict[str, str] = {}
+        self._norm_cache: Dict[str, str] = {}
+        self._tok_cache: Dict[str, Tuple[str, ...]] = {}
+        self._latest_norm_index: Dict[str, Path] = {}
+        self._file_table: List[Tuple[str, str, int, frozenset, int]] = []
+        self._tri_index: Dict[str, List[int]] = {}
+        self._short_norm_keys: List[int] = []
+
+    def refresh(self) -> None:
+        """
+        (Re)load per-project state from disk: stitcher_settings.yaml, the
+        output paths derived from it, and the cached TOC text. Lets a long-
+        lived instance be reused across builds without going stale.
+        """
         # Load project settings if present
         self.project_settings: Dict = {}
         cfg_path = self.base_dir / "stitcher_settings.yaml"
         if cfg_path.exists():
             try:
+                yaml, loader, _ = _yaml()
                 with open(cfg_path, "r", encoding="utf-8") as f:
-                    self.project_settings = yaml.safe_load(f) or {}
+                    self.project_settings = yaml.load(f, Loader=loader) or {}
             except Exception:
                 self.project_settings = {}
 
@@ -63,15 +109,14 @@ class TOCStitcherCore:
         default_name = "my_doc.md"
         name_from_cfg = (self.project_settings.get("output") or {}).get("filename")
         self.output_md = self.base_dir / (
-            output_filename or name_from_cfg or default_name
+            self._output_filename or name_from_cfg or default_name
         )
         self.output_pdf = self.output_md.with_suffix(".pdf")
         out_cfg = self.project_settings.get("output") or {}
         self._output_mode = out_cfg.get("mode", "overwrite")               # overwrite|timestamped|append
         self._pdf_pref = out_cfg.get("pdf_engine_preference", "auto")      # auto|xelatex|wkhtmltopdf
 
-        self._all_md_files: List[Path] = []
-        self._latest_norm_index: Dict[str, Path] = {}
+        self._toc_raw: Optional[str] = None   # raw TOC text, read once per refresh
 
     # ============================================================
     # ------------------------  TOC I/O  -------------------------
@@ -84,7 +129,8 @@ class TOCStitcherCore:
         Bulleted list items ('- ') are treated as H3 by default.
         H1 headings are skipped.
         """
-        lines = self.toc_file.read_text(encoding="utf-8").splitlines()
+        self._toc_raw = self._read_utf8(self.toc_file)
+        lines = self._toc_raw.splitlines()
         out: List[TOCEntry] = []
         for raw in lines:
             line = raw.strip()
@@ -108,16 +154,20 @@ class TOCStitcherCore:
     def build_toc_tree(entries: List[TOCEntry]) -> List[TOCNode]:
         """Convert flat ordered entries into a proper tree."""
         roots: List[TOCNode] = []
-        stack: List[TOCNode] = []
+        # parents[lvl] = most recent open node at that level (index 0 unused)
+        parents: List[Optional[TOCNode]] = [None] * 7
         for e in entries:
             node = TOCNode(level=e.level, title=e.title)
-            while stack and stack[-1].level >= node.level:
-                stack.pop()
-            if stack:
-                stack[-1].children.append(node)
+            lvl = e.level
+            if lvl >= len(parents):
+                parents.extend([None] * (lvl + 1 - len(parents)))
+            parent = next((p for p in parents[lvl - 1:0:-1] if p is not None), None)
+            if parent is not None:
+                parent.children.append(node)
             else:
                 roots.append(node)
-            stack.append(node)
+            parents[lvl] = node
+            parents[lvl + 1:] = [None] * (len(parents) - lvl - 1)
         return roots
 
     # ============================================================
@@ -126,39 +176,78 @@ class TOCStitcherCore:
 
     @staticmethod
     def _strip_date_prefix(name: str) -> Tuple[str, Optional[str], Optional[int]]:
-        m = TOCStitcherCore.DATE_PREFIX.match(name)
-        if not m:
+        # Hand-rolled equivalent of DATE_PREFIX (str.isdecimal == regex \d)
+        if len(name) < 9 or not name[:8].isdecimal():
             return name, None, None
-        return name[m.end():], m.group("date"), int(m.group("rev") or 0)
-
-    @staticmethod
-    def _normalize_text(s: str) -> str:
-        return re.sub(r"[^a-z0-9]+", "", s.lower())
-
-    @staticmethod
-    def _tokenize(s: str) -> List[str]:
-        return re.findall(r"[a-z0-9]+", s.lower())
+        sep = name[8]
+        if sep == "_":
+            return name[9:], name[:8], 0
+        if sep == "-":
+            end = name.find("_", 9)
+            rev = name[9:end]
+            if end > 9 and rev.isdecimal():
+                return name[end + 1:], name[:8], int(rev)
+        return name, None, None
+
+    def _normalize_text(self, s: str) -> str:
+        out = self._norm_cache.get(s)
+        if out is None:
+            out = self._norm_cache[s] = self.NORM_RE.sub("", s.lower())
+        return out
 
-    @staticmethod
-    def _jaccard(a: Iterable[str], b: Iterable[str]) -> float:
-        sa, sb = set(a), set(b)
-        if not sa or not sb:
-            return 0.0
-        return len(sa & sb) / len(sa | sb)
+    def _tokenize(self, s: str) -> Tuple[str, ...]:
+        out = self._tok_cache.get(s)
+        if out is None:
+            out = self._tok_cache[s] = tuple(self.TOKEN_RE.findall(s.lower()))
+        return out
 
     def _index_files(self) -> None:
-        """Build indices of latest *.md by normalized stem; keep all files list."""
-        all_md = [p for p in self.base_dir.glob("*.md") if p.name != self.output_md.name]
-        grouped: Dict[str, List[Tuple[Path, str, int]]] = {}
-        for p in all_md:
-            stem_no_date, date, rev = self._strip_date_prefix(p.stem)
-            grouped.setdefault(stem_no_date, []).append((p, date or "", rev or 0))
-        latest_norm: Dict[str, Path] = {}
+        """Build indices of latest *.md by normalized stem, plus the matcher's file table."""
+        out_name = self.output_md.name
+        parsed: List[Tuple[str, str, str, int]] = []   # (path, stem_no_date, date, rev)
+        with os.scandir(self.base_dir) as it:
+            for e in it:
+                name = e.name
+                # same set Path.glob("*.md") matched: case-insensitive suffix
+                # on Windows, symlinked files included, directories skipped
+                if (not os.path.normcase(name).endswith(".md") or name == out_name
+                        or not e.is_file()):
+                    continue
+                stem = name[:-3]
+                stem_no_date, date, rev = self._strip_date_prefix(stem)
+                parsed.append((e.path, stem_no_date, date or "", rev or 0))
+        grouped: Dict[str, List[Tuple[str, str, int]]] = {}
+        for path_str, stem_no_date, date, rev in parsed:
+            grouped.setdefault(stem_no_date, []).append((path_str, date, rev))
+        latest: Dict[str, str] = {}
         for stem, cands in grouped.items():
             best = max(cands, key=lambda t: (t[1], t[2]))
-            norm_key = self._normalize_text(stem)
-            latest_norm[norm_key] = best[0]
-        self._all_md_files = all_md
+            latest[self._normalize_text(stem)] = best[0]
+        key_pos = {k: pos for pos, k in enumerate(latest)}
+        # One row per file with everything the matcher needs, computed once
+        # per index: (path, norm_key, key_pos or -1 if not the latest
+        # revision for its key, token set, token count)
+        file_table: List[Tuple[str, str, int, frozenset, int]] = []
+        for path_str, stem_no_date, _, _ in parsed:
+            norm_key = self._normalize_text(stem_no_date)
+            pos = key_pos[norm_key] if latest[norm_key] == path_str else -1
+            toks = frozenset(self._tokenize(stem_no_date.replace("_", " ")))
+            file_table.append((path_str, norm_key, pos, toks, len(toks)))
+        latest_norm: Dict[str, Path] = {k: Path(p) for k, p in latest.items()}
+        self._file_table = file_table
+        # Trigram -> key positions, so substring checks only run on keys that
+        # can possibly contain (or be contained in) the target. Keys shorter
+        # than a trigram can't be indexed and are always checked.
+        tri_index: Dict[str, List[int]] = {}
+        short_keys: List[int] = []
+        for pos, key in enumerate(latest_norm):
+            if len(key) < 3:
+                short_keys.append(pos)
+                continue
+            for tri in {key[i:i + 3] for i in range(len(key) - 2)}:
+                tri_index.setdefault(tri, []).append(pos)
+        self._tri_index = tri_index
+        self._short_norm_keys = short_keys
         self._latest_norm_index = latest_norm
 
     def _match_title_to_file(self, title: str) -> Optional[Path]:
@@ -177,22 +266,33 @@ class TOCStitcherCore:
         if target_norm in self._latest_norm_index:
             return self._latest_norm_index[target_norm]
 
-        # contains/contained by
-        for k, p in self._latest_norm_index.items():
-            if target_norm in k or k in target_norm:
-                return p
-
-        # fuzzy tokens
-        target_tokens = self._tokenize(title)
+        # Single pass over the file table: earliest substring hit (by key
+        # order) and best token Jaccard are tracked together.
+        if len(target_norm) < 3:
+            cand = None   # too short to shortlist: every key is a candidate
+        else:
+            cand = set(self._short_norm_keys)
+            for i in range(len(target_norm) - 2):
+                cand.update(self._tri_index.get(target_norm[i:i + 3], ()))
+        target_tokens = frozenset(self._tokenize(title))
+        tlen = len(target_tokens)
+        sub_pos, sub_path = -1, None
         best_path, best_score = None, 0.0
-        for p in self._all_md_files:
-            stem_no_date = self._strip_date_prefix(p.stem)[0]
-            cand_tokens = self._tokenize(stem_no_date.replace("_", " "))
-            score = self._jaccard(target_tokens, cand_tokens)
+        for path_str, k, pos, toks, tlen_c in self._file_table:
+            if (pos >= 0 and (sub_pos < 0 or pos < sub_pos)
+                    and (cand is None or pos in cand)
+                    and (target_norm in k or k in target_norm)):
+                sub_pos, sub_path = pos, path_str
+            inter = len(target_tokens & toks)
+            union = tlen + tlen_c - inter
+            score = inter / union if union else 0.0
             if score > best_score:
-                best_score, best_path = score, p
+                best_score, best_path = score, path_str
+
+        if sub_path is not None:
+            return Path(sub_path)
         if best_path and best_score >= 0.40:
-            return best_path
+            return Path(best_path)
         return None
 
     # ============================================================
@@ -204,17 +304,23 @@ class TOCStitcherCore:
         first = None
         last_level = None
         jumps: List[Tuple[int, int, int]] = []
-        for i, line in enumerate(text.splitlines(), start=1):
-            m = self.HEADING_RE.match(line)
-            if not m:
-                continue
+        # Scan the whole text in C; line numbers are resolved from offsets
+        # only for headings that get reported, counting newlines forward
+        # from the previous report so the text is scanned at most once.
+        last_pos, line = 0, 1
+        for m in self.HEADING_RE.finditer(text):
             lvl = len(m.group(1))
-            ttl = m.group(2).strip()
             levels[lvl] = levels.get(lvl, 0) + 1
-            if first is None:
-                first = (lvl, ttl, i)
-            if last_level is not None and lvl > last_level + 1:
-                jumps.append((last_level, lvl, i))
+            report_first = first is None
+            report_jump = last_level is not None and lvl > last_level + 1
+            if report_first or report_jump:
+                pos = m.start()
+                line += text.count("\n", last_pos, pos)
+                last_pos = pos
+                if report_first:
+                    first = (lvl, m.group(2).strip(), line)
+                if report_jump:
+                    jumps.append((last_level, lvl, line))
             last_level = lvl
         min_level = min(levels) if levels else None
         return {
@@ -226,21 +332,25 @@ class TOCStitcherCore:
         }
 
     def _shift_headings(self, text: str, shift: int) -> str:
+        if shift == 0:
+            return text
+        hashes_for = self.HASHES
         def repl(m):
             hashes, title = m.group(1), m.group(2)
             lvl = len(hashes)
             new_lvl = max(1, min(6, lvl + shift))
-            return f"{'#' * new_lvl} {title}"
+            return f"{hashes_for[new_lvl]} {title}"
         return self.HEADING_RE.sub(repl, text)
 
     # ============================================================
     # ------------------  SLUG + LINKIFY TOC  --------------------
     # ============================================================
 
-    def _slug(self, title: str) -> str:
-        s = title.lower()
-        s = re.sub(r"[^a-z0-9\s-]", "", s)
-        return re.sub(r"\s+", "-", s).strip("-")
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _slug(title: str) -> str:
+        s = TOCStitcherCore.SLUG_STRIP_RE.sub("", title.lower())
+        return TOCStitcherCore.SLUG_WS_RE.sub("-", s).strip("-")
 
     def _linkify_original_toc(self, toc_md: str, entries: List[TOCEntry]) -> str:
         """
@@ -249,51 +359,49 @@ class TOCStitcherCore:
           - List items: wrap the whole list text in [text](#slug)
         No reordering or wording changes.
         """
+        # Entry-side work is the same for every TOC line: do it once
+        norms = [self._normalize_text(e.title) for e in entries]
+        toks_list = [frozenset(self._tokenize(e.title)) for e in entries]
+        tlens = [len(t) for t in toks_list]
+        slugs = [self._slug(e.title) for e in entries]
+
         def slug_for_best_match(text: str) -> Optional[str]:
-            norm = lambda s: re.sub(r"[^a-z0-9]+", "", s.lower())
-            tnorm = norm(text)
+            tnorm = self._normalize_text(text)
             # exact normalized match
-            for e in entries:
-                if norm(e.title) == tnorm:
-                    return self._slug(e.title)
+            for i, en in enumerate(norms):
+                if en == tnorm:
+                    return slugs[i]
             # contains/contained-by
-            for e in entries:
-                en = norm(e.title)
+            for i, en in enumerate(norms):
                 if en in tnorm or tnorm in en:
-                    return self._slug(e.title)
+                    return slugs[i]
             # token overlap
-            def toks(s): return set(re.findall(r"[a-z0-9]+", s.lower()))
-            tt = toks(text)
+            tt = frozenset(self._tokenize(text))
+            ttlen = len(tt)
             best, best_score = None, 0.0
-            for e in entries:
-                score = len(tt & toks(e.title)) / max(1, len(tt | toks(e.title)))
+            for i, et in enumerate(toks_list):
+                inter = len(tt & et)
+                score = inter / max(1, ttlen + tlens[i] - inter)
                 if score > best_score:
-                    best, best_score = self._slug(e.title), score
+                    best, best_score = slugs[i], score
             return best if best_score >= 0.45 else None
 
         out = []
         for raw in toc_md.splitlines():
             line = raw.rstrip("\n")
 
-            # Already linked? leave it
-            if "](" in line:
+            # Already linked, or nothing the matcher could key on? leave it
+            if "](" in line or not self.ALNUM_RE.search(line):
                 out.append(line)
                 continue
 
-            # Headings
-            m = re.match(r"^(\s*)(#{1,6})[ \t]+(.+?)\s*$", line)
-            if m:
-                indent, hashes, title_text = m.groups()
-                slug = slug_for_best_match(title_text)
-                out.append(f"{indent}{hashes} [{title_text}](#{slug})" if slug else line)
-                continue
-
-            # List items
-            m = re.match(r"^(\s*)-\s+(.+?)\s*$", line)
+            # Headings or list items
+            m = self.TOC_LINE_RE.match(line)
             if m:
-                indent, li_text = m.groups()
-                slug = slug_for_best_match(li_text)
-                out.append(f"{indent}- [{li_text}](#{slug})" if slug else line)
+                indent, hashes, text = m.groups()
+                slug = slug_for_best_match(text)
+                marker = hashes or "-"
+                out.append(f"{indent}{marker} [{text}](#{slug})" if slug else line)
                 continue
 
             out.append(line)
@@ -333,44 +441,29 @@ class TOCStitcherCore:
     # -------------------  BUILD (TREE-DRIVEN)  ------------------
     # ============================================================
 
-    def _fix_horizontal_rules(self, content):
-        """Replace --- with *** except in YAML frontmatter"""
-        lines = content.split('\n')
-        result = []
-        in_frontmatter = False
-        frontmatter_closed = False
-        dash_count = 0
-        
-        for i, line in enumerate(lines):
-            # Check if this line is exactly "---" (horizontal rule or YAML delimiter)
-            if line.strip() == '---':
-                # First --- at the start of document opens frontmatter
-                if i == 0 or (i < 3 and all(l.strip() == '' for l in lines[:i])):
-                    in_frontmatter = True
-                    dash_count = 1
-                    result.append(line)
-                # Second --- closes frontmatter
-                elif in_frontmatter and dash_count == 1:
-                    in_frontmatter = False
-                    frontmatter_closed = True
-                    dash_count = 2
-                    result.append(line)
-                # Any other --- after frontmatter is a horizontal rule - replace it
-                elif frontmatter_closed:
-                    result.append('***')
-                else:
-                    # Before frontmatter is established, keep as is
-                    result.append(line)
-            else:
-                result.append(line)
-        
-        return '\n'.join(result)
-
-    def build_markdown(self, selected_entries: List[TOCEntry], log_fn=None) -> Tuple[Path, int]:
+    @staticmethod
+    def _read_utf8(path: Path) -> str:
+        """Read and decode in one C-level pass; normalize newlines like text mode."""
+        text = path.read_bytes().decode("utf-8", errors="replace")
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
+
+    def _fix_horizontal_rules(self, content: str) -> str:
+        """Replace --- rule lines with *** (body text only: the YAML
+        frontmatter is written separately and never passes through here)"""
+        if "---" not in content:
+            return content
+        return self.HRULE_RE.sub("***", content)
+
+    def build_markdown(self, selected_entries: List[TOCEntry], log_fn=None,
+                       flush_fn=None) -> Tuple[Path, int]:
         """
         1) Build TOC tree from ordered selection.
         2) Pre-order traversal to assemble content.
         3) If node is 'Table of Contents', linkify original TOC and insert here.
+        flush_fn, if given, is called before waiting on a file read so a
+        batching log_fn can show what it has queued so far.
         """
         def _log(msg: str):
             if log_fn:
@@ -384,31 +477,61 @@ class TOCStitcherCore:
         self._index_files()
         roots = self.build_toc_tree(selected_entries)
 
-        sections: List[str] = []
-
-        def process_node(node: TOCNode, is_first_top_level: bool) -> None:
+        # Sections stream straight to the output file, separated by "\n".
+        # Every chunk starts on a fresh line, so --- rules can be fixed per
+        # chunk without seeing the whole document.
+        written = 0
+        at_start = True
+        out = None
+        # binary output, but keep the platform newlines text mode used to
+        # write (CRLF on Windows)
+        newline = os.linesep.encode("ascii")
+
+        def encode(text: str) -> bytes:
+            data = text.encode("utf-8")
+            return data if newline == b"\n" else data.replace(b"\n", newline)
+
+        def emit(chunk: str) -> None:
+            nonlocal at_start, written
+            data = encode(self._fix_horizontal_rules(chunk))
+            if not at_start:
+                data = newline + data
+            at_start = False
+            written += out.write(data)
+
+        def _load_and_analyze(path: Path) -> Tuple[str, Dict]:
+            raw = self._read_utf8(path).strip()
+            return raw, self._analyze_headings(raw)
+
+        def _handle(node: TOCNode, is_first_top_level: bool,
+                    path: Optional[Path], loaded: Optional[Future]) -> None:
             title_lower = node.title.strip().lower()
 
             # Page break between top-level H2 siblings (not before the first)
             if node.level == 2 and not is_first_top_level:
-                sections.append('<div style="page-break-after: always;"></div>\n')
+                emit('<div style="page-break-after: always;"></div>\n')
 
             # Special: TOC node -> linkify original TOC in place
             if title_lower == "table of contents":
-                toc_raw = self.toc_file.read_text(encoding="utf-8")
+                if self._toc_raw is None:
+                    self._toc_raw = self._read_utf8(self.toc_file)
+                toc_raw = self._toc_raw
                 linked = self._linkify_original_toc(toc_raw, selected_entries)
-                sections.append(f'<a id="{self._slug(node.title)}"></a>\n')
-                sections.append(linked)
+                emit(f'<a id="{self._slug(node.title)}"></a>\n')
+                emit(linked)
                 _log("📖 Inserted original TOC (linkified).")
             else:
                 # Normal doc node
-                path = self._match_title_to_file(node.title)
                 if not path:
-                    sections.append(f"<!-- Missing: {node.title} -->")
+                    emit(f"<!-- Missing: {node.title} -->")
                     _log(f"⚠️ Missing: {node.title}")
                 else:
-                    raw = path.read_text(encoding="utf-8").strip()
-                    meta = self._analyze_headings(raw)
+                    if flush_fn and not loaded.done():
+                        try:
+                            flush_fn()
+                        except Exception:
+                            pass
+                    raw, meta = loaded.result()
                     if meta["min_level"] is None:
                         content = f"{'#' * node.level} {node.title}\n\n{raw}"
                         _log(f"ℹ️ {path.name}: no headings; inserted H{node.level}.")
@@ -419,43 +542,74 @@ class TOCStitcherCore:
                             _log(f"🔧 {path.name}: promoted by {abs(shift)} (→ H{node.level}).")
                         elif shift < 0:
                             _log(f"🔧 {path.name}: demoted by {abs(shift)} (→ H{node.level}).")
-                    sections.append(f'<a id="{self._slug(node.title)}"></a>\n')
-                    sections.append(content)
-
-            # Process children (no page breaks between parent and children)
-            for child in node.children:
-                process_node(child, is_first_top_level=False)
+                    emit(f'<a id="{self._slug(node.title)}"></a>\n')
+                    emit(content)
+
+        # Flatten tree in document order (iterative pre-order; children get
+        # no page break between parent and child)
+        order: List[Tuple[TOCNode, bool]] = []
+        stack = [(root, i == 0) for i, root in enumerate(roots)][::-1]
+        while stack:
+            node, is_first = stack.pop()
+            order.append((node, is_first))
+            stack.extend((c, False) for c in reversed(node.children))
+
+        # Resolve files up front and overlap reads + heading scans in a pool;
+        # assembly stays serial so output and log order are deterministic.
+        paths = [
+            None if node.title.strip().lower() == "table of contents"
+            else self._match_title_to_file(node.title)
+            for node, _ in order
+        ]
+        workers = min(32, (os.cpu_count() or 1) * 4)
+        # Assemble into a sibling temp file so a failed read never leaves the
+        # previous output truncated (overwrite) or half-appended (append).
+        tmp_path = self.output_md.with_name(self.output_md.name + ".tmp")
+        try:
+            with tmp_path.open("wb") as out, \
+                    ThreadPoolExecutor(max_workers=workers) as ex:
+                written += out.write(encode(self._metadata_header() + "\n"))
+                # Bounded lookahead: at most `workers` files are read ahead
+                # of assembly, and each result is dropped once emitted, so
+                # peak memory is a window of sources, not the whole corpus.
+                ahead: deque = deque()
+                nxt = 0
+                for i, ((node, is_first), path) in enumerate(zip(order, paths)):
+                    while nxt < len(paths) and nxt - i < workers:
+                        p = paths[nxt]
+                        ahead.append(ex.submit(_load_and_analyze, p) if p else None)
+                        nxt += 1
+                    _handle(node, is_first, path, ahead.popleft())
+            if self._output_mode == "append":
+                with tmp_path.open("rb") as src, self.output_md.open("ab") as dst:
+                    shutil.copyfileobj(src, dst)
+                tmp_path.unlink()
+            else:
+                os.replace(tmp_path, self.output_md)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
 
-        # Walk tree in document order
-        for i, root in enumerate(roots):
-            process_node(root, is_first_top_level=(i == 0))
-
-        compiled = self._metadata_header() + "\n" + "\n".join(sections)
-        
-        # Fix horizontal rules (replace --- with *** except in YAML frontmatter)
-        compiled = self._fix_horizontal_rules(compiled)
-
-        # Write (overwrite by default; modes can be extended if desired)
-        if self._output_mode == "append":
-            with self.output_md.open("a", encoding="utf-8") as f:
-                f.write(compiled)
-            final_path = self.output_md
-            chars = final_path.stat().st_size
-        else:
-            chars = self.output_md.write_text(compiled, encoding="utf-8")
-            final_path = self.output_md
+        final_path = self.output_md
+        nbytes = final_path.stat().st_size if self._output_mode == "append" else written
 
         if not final_path.exists() or final_path.stat().st_size == 0:
             raise IOError(f"Markdown write failed or empty: {final_path}")
 
-        return final_path.resolve(), chars
+        return final_path.resolve(), nbytes
     # ============================================================
     # -----------------------  PDF EXPORT  -----------------------
     # ============================================================
 
     def _which(self, exe: str) -> Optional[str]:
+        # Only hits are cached: a tool installed after a failed build must be
+        # found on the next one without re-picking the directory.
+        cached = self._exe_cache.get(exe)
+        if cached is not None:
+            return cached
         p = shutil.which(exe)
         if p:
+            self._exe_cache[exe] = p
             return p
         # common Windows install locations (helps before PATH refresh)
         common = {
@@ -472,10 +626,10 @@ class TOCStitcherCore:
                 r"C:\Program Files (x86)\wkhtmltopdf\bin\wkhtmltopdf.exe",
             ],
         }.get(exe.lower(), [])
-        for path in common:
-            if Path(path).exists():
-                return path
-        return None
+        found = next((path for path in common if Path(path).exists()), None)
+        if found:
+            self._exe_cache[exe] = found
+        return found
 
     def _pandoc_common_args(self) -> List[str]:
         args = [
@@ -514,6 +668,15 @@ class TOCStitcherCore:
 
         prefer = getattr(self, "_pdf_pref", "auto").lower()
 
+        def run(args: List[str]) -> None:
+            # No TTY for pandoc; keep stdout quiet and stderr for the log
+            subprocess.run(args, check=True, stdin=subprocess.DEVNULL,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+        def why(e: subprocess.CalledProcessError) -> str:
+            err = (e.stderr or b"").decode("utf-8", errors="replace").strip()
+            return f"{e}\n{err}" if err else str(e)
+
         def try_xelatex() -> bool:
             xelatex = self._which("xelatex")
             if not xelatex:
@@ -524,11 +687,11 @@ class TOCStitcherCore:
                     "-V", "mainfont=Segoe UI",
                     "-o", str(self.output_pdf)]
             try:
-                subprocess.run(args, check=True)
+                run(args)
                 _log(f"✅ PDF generated: {self.output_pdf}")
                 return True
             except subprocess.CalledProcessError as e:
-                _log(f"[warn] XeLaTeX failed: {e}")
+                _log(f"[warn] XeLaTeX failed: {why(e)}")
                 return False
 
         def try_wkhtml() -> bool:
@@ -540,11 +703,11 @@ class TOCStitcherCore:
                     "--pdf-engine=wkhtmltopdf",
                     "-o", str(self.output_pdf)]
             try:
-                subprocess.run(args, check=True)
+                run(args)
                 _log(f"✅ PDF generated: {self.output_pdf}")
                 return True
             except subprocess.CalledProcessError as e:
-                _log(f"[warn] wkhtmltopdf failed: {e}")
+                _log(f"[warn] wkhtmltopdf failed: {why(e)}")
                 return False
 
         ok = False
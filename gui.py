@@ -1,87 +1,197 @@
 # gui.py - Updated with metadata editor
+from contextlib import contextmanager
 from pathlib import Path
+import functools
+import hashlib
+import os
 import re
-import yaml
 
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QDesktopServices, QShortcut, QKeySequence
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThread, QThreadPool, QElapsedTimer, pyqtSignal
+from PyQt6.QtGui import QShortcut, QKeySequence
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QFileDialog, QTreeWidget, QTreeWidgetItem, QTextEdit, QLabel,
-    QDialog, QFormLayout, QLineEdit, QCheckBox, QTabWidget, QMessageBox
+    QPushButton, QFileDialog, QTreeWidget, QTreeWidgetItem, QTreeWidgetItemIterator,
+    QTextEdit, QPlainTextEdit, QLabel, QDialog, QFormLayout, QLineEdit, QCheckBox,
+    QTabWidget, QMessageBox
 )
-from PyQt6.QtCore import QUrl
 
-from core import TOCStitcherCore, TOCEntry
+from core import TOCStitcherCore, TOCEntry, _yaml
 
 # -------------------- constants & helpers --------------------
 
 SETTINGS_FILE = "stitcher_settings.yaml"
 LEVEL_ROLE = Qt.ItemDataRole.UserRole + 1
+SLUG_ROLE = Qt.ItemDataRole.UserRole + 2
 
+# slugify patterns for non-ASCII titles. Deliberately not re.ASCII: Unicode
+# whitespace must keep acting as a separator or persisted slugs would change.
+_SLUG_STRIP_RE = re.compile(r"[^a-z0-9\s-]")
+_SLUG_WS_RE = re.compile(r"\s+")
+
+# ASCII chars slugify drops: everything except a-z, 0-9, '-' and whitespace
+_SLUG_DROP = str.maketrans("", "", "".join(
+    c for c in map(chr, range(128))
+    if not (c.islower() or c.isdigit() or c == "-" or c.isspace())
+))
+
+@functools.lru_cache(maxsize=4096)
 def slugify(title: str) -> str:
     s = title.lower()
-    s = re.sub(r"[^a-z0-9\s-]", "", s)
-    return re.sub(r"\s+", "-", s).strip("-")
+    if not s.isascii():
+        return _SLUG_WS_RE.sub("-", _SLUG_STRIP_RE.sub("", s)).strip("-")
+    # Regex-free fast path: drop via translate table, collapse whitespace runs
+    return "-".join(s.translate(_SLUG_DROP).split()).strip("-")
 
 
 # ----------------------- YAML helpers -----------------------
+# (PyYAML itself is imported lazily via core._yaml)
+
+_DEFAULT_METADATA = {
+    "title": "Compiled Document",
+    "subtitle": "",
+    "author": "",
+    "date": "",
+    "license": "",
+    "geometry": "margin=1in",
+    "fontsize": "12pt",
+}
+_DEFAULT_OUTPUT = {
+    "filename": "compiled_document.md",
+    "mode": "overwrite",
+    "pdf_engine_preference": "auto",
+}
+_DEFAULT_TOC = {"place": "by_toc"}
+
+def toc_fingerprint(entries: list[TOCEntry]) -> str:
+    """Cheap digest of the TOC structure (count + level/title of every entry)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(len(entries)).encode("utf-8"))
+    for e in entries:
+        h.update(f"\n{int(e.level)}\t{e.title}".encode("utf-8"))
+    return h.hexdigest()
 
-def settings_from_toc(entries: list[TOCEntry]) -> dict:
+def settings_from_toc(entries: list[TOCEntry], slugs: list[str] | None = None) -> dict:
+    # defaults are flat str dicts: a shallow copy keeps callers' edits local
+    if slugs is None:
+        slugs = [slugify(e.title) for e in entries]
     return {
         "version": 1,
+        "fingerprint": toc_fingerprint(entries),
         "selections": [
-            {"slug": slugify(e.title), "title": e.title, "level": int(e.level), "include": True}
-            for e in entries
+            {"slug": slug, "title": e.title,
+             "level": e.level if type(e.level) is int else int(e.level), "include": True}
+            for e, slug in zip(entries, slugs)
         ],
-        "metadata": {
-            "title": "Compiled Document",
-            "subtitle": "",
-            "author": "",
-            "date": "",
-            "license": "",
-            "geometry": "margin=1in",
-            "fontsize": "12pt",
-        },
-        "output": {
-            "filename": "compiled_document.md",
-            "mode": "overwrite",
-            "pdf_engine_preference": "auto",
-        },
-        "toc": {"place": "by_toc"},
+        "metadata": dict(_DEFAULT_METADATA),
+        "output": dict(_DEFAULT_OUTPUT),
+        "toc": dict(_DEFAULT_TOC),
     }
 
+# path -> ((mtime_ns, size), parsed settings); callers get private copies
+_SETTINGS_CACHE: dict[str, tuple[tuple[int, int], dict]] = {}
+
+def _copy_tree(obj):
+    """Copy nested dict/list data (what YAML settings are made of)."""
+    if isinstance(obj, dict):
+        return {k: _copy_tree(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_copy_tree(v) for v in obj]
+    return obj
+
 def load_settings(path: Path) -> dict | None:
+    key = str(path)
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f) or None
+        st = os.stat(key)
     except FileNotFoundError:
+        _SETTINGS_CACHE.pop(key, None)
         return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit = _SETTINGS_CACHE.get(key)
+    if hit is not None and hit[0] == stamp:
+        return _copy_tree(hit[1])
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    # bytes go straight to the loader's UTF-8 reader, no text-mode wrapper
+    yaml, loader, _ = _yaml()
+    data = yaml.load(raw, Loader=loader) or None
+    if isinstance(data, dict):
+        _SETTINGS_CACHE[key] = (stamp, _copy_tree(data))
+    return data
 
 def save_settings(path: Path, data: dict) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        yaml.safe_dump(data, f, sort_keys=False, allow_unicode=True)
-
-def reconcile_settings_with_toc(settings: dict, entries: list[TOCEntry]) -> dict:
-    prev = {s.get("slug"): s for s in settings.get("selections", [])}
+    key = str(path)
+    _SETTINGS_CACHE.pop(key, None)
+    yaml, _, dumper = _yaml()
+    # emit to one UTF-8 bytes object, then a single write (files are a few KB)
+    path.write_bytes(yaml.dump(data, Dumper=dumper, sort_keys=False, allow_unicode=True,
+                               default_flow_style=False, encoding="utf-8"))
+    # The safe dumper only accepts plain YAML types, which load back equal,
+    # so the next load of this file can skip the parse.
+    _remember_settings(key, data)
+
+def save_settings_text(path: Path, text: str, data: dict) -> None:
+    """Write already-validated YAML text verbatim (keeps comments/layout).
+
+    ``data`` must be the result of parsing ``text``; it seeds the cache."""
+    key = str(path)
+    _SETTINGS_CACHE.pop(key, None)
+    if not text.endswith("\n"):
+        text += "\n"
+    path.write_bytes(text.encode("utf-8"))
+    _remember_settings(key, data)
+
+def _remember_settings(key: str, data: dict) -> None:
+    st = os.stat(key)
+    _SETTINGS_CACHE[key] = ((st.st_mtime_ns, st.st_size), _copy_tree(data))
+
+_SETTINGS_KEYS = frozenset({"version", "fingerprint", "selections", "metadata", "output", "toc"})
+
+def reconcile_settings_with_toc(settings: dict, entries: list[TOCEntry],
+                                slugs: list[str] | None = None) -> tuple[dict, bool]:
+    """Return (reconciled settings, dirty); dirty is True when the result
+    needs to be written back, i.e. whenever the stored fingerprint, key set
+    or selection count doesn't match. Matched selection dicts are reused
+    (and updated in place) rather than copied. `slugs`, if given, are the
+    precomputed slugify(e.title) for each entry."""
+    fingerprint = toc_fingerprint(entries)
+    old_list = settings.get("selections", [])
+    # TOC unchanged since the settings were last reconciled: nothing to do,
+    # unless a hand edit left a selection without a slug (rebuild those)
+    if (settings.get("fingerprint") == fingerprint and settings.keys() == _SETTINGS_KEYS
+            and len(old_list) == len(entries)
+            and all(isinstance(s, dict) and "slug" in s for s in old_list)):
+        return settings, False
+    prev = {s.get("slug"): s for s in old_list}
+    if slugs is None:
+        slugs = [slugify(e.title) for e in entries]
     new_list = []
-    for e in entries:
-        slug = slugify(e.title)
-        if slug in prev:
-            item = dict(prev[slug])
+    used: set[str] = set()
+    for e, slug in zip(entries, slugs):
+        level = int(e.level)
+        item = prev.get(slug)
+        if item is not None:
+            if slug in used:
+                # same slug twice in the TOC: don't share one dict (YAML alias)
+                item = dict(item)
+            used.add(slug)
             item["title"] = e.title
-            item["level"] = int(e.level)
+            item["level"] = level
         else:
-            item = {"slug": slug, "title": e.title, "level": int(e.level), "include": True}
+            item = {"slug": slug, "title": e.title, "level": level, "include": True}
         new_list.append(item)
     out = {
         "version": settings.get("version", 1),
+        "fingerprint": fingerprint,
         "selections": new_list,
-        "metadata": settings.get("metadata", settings_from_toc(entries)["metadata"]),
-        "output": settings.get("output", settings_from_toc(entries)["output"]),
-        "toc": settings.get("toc", {"place": "by_toc"}),
+        "metadata": settings["metadata"] if "metadata" in settings else dict(_DEFAULT_METADATA),
+        "output": settings["output"] if "output" in settings else dict(_DEFAULT_OUTPUT),
+        "toc": settings["toc"] if "toc" in settings else dict(_DEFAULT_TOC),
     }
-    return out
+    # past the fast path the fingerprint, key set or length differs, so the
+    # result always needs writing (at minimum to store the new fingerprint)
+    return out, True
 
 
 # ----------------------- Metadata Editor Dialog -----------------------
@@ -98,6 +208,12 @@ class MetadataEditorDialog(QDialog):
         self.setMinimumWidth(600)
         self.setMinimumHeight(500)
         
+        # form vs. raw YAML edits since the last sync (see on_tab_changed)
+        self._form_dirty = False
+        self._yaml_dirty = False
+        self._yaml_seeded = False
+        self._rendered_settings = None   # copy of what the YAML editor shows
+        
         self.init_ui()
         self.load_settings()
     
@@ -117,11 +233,12 @@ class MetadataEditorDialog(QDialog):
         self.date_edit = QLineEdit()
         self.license_edit = QLineEdit()
         
-        doc_layout.addRow("Title:", self.title_edit)
-        doc_layout.addRow("Subtitle:", self.subtitle_edit)
-        doc_layout.addRow("Author:", self.author_edit)
-        doc_layout.addRow("Date:", self.date_edit)
-        doc_layout.addRow("License:", self.license_edit)
+        for label, widget in (("Title:", self.title_edit),
+                              ("Subtitle:", self.subtitle_edit),
+                              ("Author:", self.author_edit),
+                              ("Date:", self.date_edit),
+                              ("License:", self.license_edit)):
+            doc_layout.addRow(label, widget)
         
         self.tabs.addTab(doc_tab, "Document Info")
         
@@ -141,10 +258,11 @@ class MetadataEditorDialog(QDialog):
         self.toc_depth_edit = QLineEdit()
         self.toc_depth_edit.setPlaceholderText("e.g., 3")
         
-        pdf_layout.addRow("Page Geometry:", self.geometry_edit)
-        pdf_layout.addRow("Font Size:", self.fontsize_edit)
-        pdf_layout.addRow("", self.toc_checkbox)
-        pdf_layout.addRow("TOC Depth:", self.toc_depth_edit)
+        for label, widget in (("Page Geometry:", self.geometry_edit),
+                              ("Font Size:", self.fontsize_edit),
+                              ("", self.toc_checkbox),
+                              ("TOC Depth:", self.toc_depth_edit)):
+            pdf_layout.addRow(label, widget)
         
         # Add warning label
         warning_label = QLabel("⚠️ Disable auto-TOC if you already have a manual TOC in your document")
@@ -164,8 +282,9 @@ class MetadataEditorDialog(QDialog):
         self.pdf_engine_edit = QLineEdit()
         self.pdf_engine_edit.setPlaceholderText("auto, xelatex, or wkhtmltopdf")
         
-        output_layout.addRow("Output Filename:", self.output_filename_edit)
-        output_layout.addRow("PDF Engine:", self.pdf_engine_edit)
+        for label, widget in (("Output Filename:", self.output_filename_edit),
+                              ("PDF Engine:", self.pdf_engine_edit)):
+            output_layout.addRow(label, widget)
         
         self.tabs.addTab(output_tab, "Output")
         
@@ -206,6 +325,20 @@ class MetadataEditorDialog(QDialog):
         
         # Connect tab changes to sync YAML
         self.tabs.currentChanged.connect(self.on_tab_changed)
+        
+        # Track edits so tab switches only sync what actually changed
+        for edit in (self.title_edit, self.subtitle_edit, self.author_edit, self.date_edit,
+                     self.license_edit, self.geometry_edit, self.fontsize_edit,
+                     self.toc_depth_edit, self.output_filename_edit, self.pdf_engine_edit):
+            edit.textChanged.connect(self._mark_form_dirty)
+        self.toc_checkbox.toggled.connect(self._mark_form_dirty)
+        self.yaml_editor.textChanged.connect(self._mark_yaml_dirty)
+    
+    def _mark_form_dirty(self, *_):
+        self._form_dirty = True
+    
+    def _mark_yaml_dirty(self):
+        self._yaml_dirty = True
     
     def load_settings(self):
         """Load existing settings from YAML file"""
@@ -231,25 +364,37 @@ class MetadataEditorDialog(QDialog):
         self.output_filename_edit.setText(output.get("filename", "compiled_document.md"))
         self.pdf_engine_edit.setText(output.get("pdf_engine_preference", "auto"))
         
-        # Populate YAML editor
-        self.yaml_editor.setPlainText(yaml.dump(settings, default_flow_style=False, sort_keys=False))
+        # YAML editor is filled on first visit to its tab (see on_tab_changed)
+        self._yaml_seeded = False
+        self._rendered_settings = None
+        self._form_dirty = self._yaml_dirty = False
     
     def on_tab_changed(self, index):
         """Sync form fields to YAML editor when switching tabs"""
         current_tab_name = self.tabs.tabText(index)
-        
-        # Always update internal settings from current form state first
-        self.update_settings_from_form()
+        yaml, loader, dumper = _yaml()
         
         if current_tab_name == "Raw YAML":
             # Switching TO YAML tab - update YAML editor with current form values
-            self.yaml_editor.setPlainText(yaml.dump(self.settings, default_flow_style=False, sort_keys=False))
-        else:
+            if self._yaml_seeded and not self._form_dirty:
+                return  # editor already reflects self.settings
+            if self._form_dirty:
+                self.update_settings_from_form()
+                if (self._yaml_seeded and not self._yaml_dirty
+                        and self.settings == self._rendered_settings):
+                    self._form_dirty = False
+                    return  # edits netted out; editor text is still current
+            self.yaml_editor.setPlainText(yaml.dump(self.settings, Dumper=dumper, default_flow_style=False,
+                                                    sort_keys=False, allow_unicode=True))
+            self._rendered_settings = _copy_tree(self.settings)
+            self._yaml_seeded = True
+            self._form_dirty = self._yaml_dirty = False
+        elif self._yaml_dirty:
             # Switching FROM YAML tab - try to parse and update form fields
             try:
                 yaml_text = self.yaml_editor.toPlainText()
                 if yaml_text.strip():
-                    parsed = yaml.safe_load(yaml_text)
+                    parsed = yaml.load(yaml_text, Loader=loader)
                     if parsed:
                         self.settings = parsed
                         # Update form fields from parsed YAML
@@ -267,6 +412,8 @@ class MetadataEditorDialog(QDialog):
                         output = self.settings.get("output", {})
                         self.output_filename_edit.setText(output.get("filename", "compiled_document.md"))
                         self.pdf_engine_edit.setText(output.get("pdf_engine_preference", "auto"))
+                        self._rendered_settings = _copy_tree(self.settings)
+                        self._form_dirty = self._yaml_dirty = False
             except yaml.YAMLError:
                 pass  # Keep current form values if YAML is invalid
     
@@ -304,21 +451,25 @@ class MetadataEditorDialog(QDialog):
     
     def save_settings(self):
         """Save settings to YAML file"""
+        yaml, loader, _ = _yaml()
         try:
             # If on YAML tab, try to parse it first
             if self.tabs.tabText(self.tabs.currentIndex()) == "Raw YAML":
                 yaml_text = self.yaml_editor.toPlainText()
                 try:
-                    self.settings = yaml.safe_load(yaml_text) or {}
+                    self.settings = yaml.load(yaml_text, Loader=loader) or {}
                 except yaml.YAMLError as e:
                     QMessageBox.warning(self, "YAML Error", f"Invalid YAML syntax:\n{e}")
                     return
+                if isinstance(self.settings, dict) and self.settings:
+                    # Valid mapping: write the user's text as-is, no re-emit
+                    save_settings_text(self.settings_file, yaml_text, self.settings)
+                else:
+                    save_settings(self.settings_file, self.settings)
             else:
                 # Update from form fields
                 self.update_settings_from_form()
-            
-            # Write to file
-            save_settings(self.settings_file, self.settings)
+                save_settings(self.settings_file, self.settings)
             
             QMessageBox.information(self, "Success", f"Settings saved to:\n{self.settings_file}")
             self.accept()
@@ -351,31 +502,99 @@ class MetadataEditorDialog(QDialog):
 
 # ------------------------- worker ---------------------------
 
-class BuilderThread(QThread):
-    message = pyqtSignal(str)
+class BuilderSignals(QObject):
+    message = pyqtSignal(list)   # batch of log lines
     finished = pyqtSignal(bool)
 
-    def __init__(self, base_dir: Path, selected_entries: list[TOCEntry], export_pdf: bool = True):
+
+class BuilderTask(QRunnable):
+    """One build on a QThreadPool worker, reusing the window's TOCStitcherCore."""
+
+    FLUSH_MS = 100
+    FLUSH_LINES = 50
+
+    def __init__(self, core: TOCStitcherCore, selected_entries: list[TOCEntry], export_pdf: bool = True):
         super().__init__()
-        self.base_dir = base_dir
+        self.signals = BuilderSignals()
+        self.message = self.signals.message
+        self.finished = self.signals.finished
+        self.core = core
         self.selected_entries = selected_entries
         self.export_pdf_flag = export_pdf
+        self._pending: list[str] = []
+        self._timer = QElapsedTimer()
+
+    def _log(self, msg: str) -> None:
+        # Queue lines and cross the thread boundary every FLUSH_MS or
+        # FLUSH_LINES lines, whichever comes first. build_markdown also
+        # flushes before blocking on a read, so queued lines can't go stale.
+        self._pending.append(msg)
+        if len(self._pending) >= self.FLUSH_LINES or self._timer.hasExpired(self.FLUSH_MS):
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self.message.emit(self._pending)
+            self._pending = []
+        self._timer.restart()
 
     def run(self):
+        self._timer.start()
         try:
-            core = TOCStitcherCore(self.base_dir)
-            self.message.emit("🧩 Building Markdown…")
-            md_path, chars = core.build_markdown(self.selected_entries, log_fn=self.message.emit)
-            self.message.emit(f"✅ Markdown compiled: {md_path}")
-            self.message.emit(f"   • Characters written: {chars}")
+            core = self.core
+            core.refresh()   # pick up settings/TOC edits since the last build
+            self._log("🧩 Building Markdown…")
+            self._flush()   # show the start now, not with the first build line
+            md_path, nbytes = core.build_markdown(self.selected_entries, log_fn=self._log,
+                                                  flush_fn=self._flush)
+            self._log(f"✅ Markdown compiled: {md_path}")
+            self._log(f"   • Bytes written: {nbytes}")
             if self.export_pdf_flag:
-                core.export_pdf(log_fn=self.message.emit)
+                self._flush()   # PDF export can take a while; show progress first
+                core.export_pdf(log_fn=self._log)
+            self._flush()
             self.finished.emit(True)
         except Exception as e:
-            self.message.emit(f"❌ Build failed: {e}")
+            self._log(f"❌ Build failed: {e}")
+            self._flush()
             self.finished.emit(False)
 
 
+class LoaderThread(QThread):
+    """Parse the TOC and load/reconcile project settings off the GUI thread."""
+    message = pyqtSignal(str)
+    loaded = pyqtSignal(object, object, object)   # entries, settings, slugs
+    failed = pyqtSignal(str)
+
+    def __init__(self, base_dir: Path):
+        super().__init__()
+        self.base_dir = base_dir
+
+    def run(self):
+        try:
+            # only the TOC is needed here; settings are handled below
+            core = TOCStitcherCore(self.base_dir, load=False)
+            entries = core.parse_toc()
+            # slugged once here, reused by settings and the tree's SLUG_ROLE
+            slugs = [slugify(e.title) for e in entries]
+
+            # Build or reconcile settings from TOC
+            cfg_path = self.base_dir / SETTINGS_FILE
+            existing = load_settings(cfg_path)
+            if existing is None:
+                settings = settings_from_toc(entries, slugs)
+                save_settings(cfg_path, settings)
+                self.message.emit(f"🆕 Created {cfg_path.name} from TOC.")
+            else:
+                settings, dirty = reconcile_settings_with_toc(existing, entries, slugs)
+                if dirty:
+                    save_settings(cfg_path, settings)
+                    self.message.emit(f"🔄 Updated {cfg_path.name} to match current TOC.")
+            self.loaded.emit(entries, settings, slugs)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
 # --------------------------- UI -----------------------------
 
 class StitcherGUI(QMainWindow):
@@ -383,7 +602,12 @@ class StitcherGUI(QMainWindow):
         super().__init__()
         self.setWindowTitle("TOC Document Stitcher for MD")
         self.base_dir: Path | None = None
+        self.core: TOCStitcherCore | None = None   # reused across builds
         self.settings: dict = {}
+        self.is_loading = False   # LoaderThread in flight for base_dir
+        self.is_building = False  # BuilderTask in flight (at most one)
+        self.project_loaded = False   # tree/settings reflect base_dir
+        self.build_dir: Path | None = None   # project of the running build
 
         # central layout
         central = QWidget(self)
@@ -424,8 +648,9 @@ class StitcherGUI(QMainWindow):
         layout.addLayout(btn_row)
 
         # output box
-        self.output = QTextEdit()
+        self.output = QPlainTextEdit()
         self.output.setReadOnly(True)
+        self.output.setMaximumBlockCount(10_000)
         layout.addWidget(self.output, 1)
 
         self.setCentralWidget(central)
@@ -438,83 +663,91 @@ class StitcherGUI(QMainWindow):
         self.btn_metadata.clicked.connect(self.open_metadata_editor)
 
         # hotkey: Ctrl+S to save settings
-        QShortcut(QKeySequence("Ctrl+S"), self, activated=self.save_project_settings)
+        self.shortcut_save = QShortcut(QKeySequence("Ctrl+S"), self, activated=self.save_project_settings)
+        self.shortcut_save.setEnabled(False)
 
     # ---------- tree helpers ----------
 
-    def populate_toc(self, entries: list[TOCEntry]) -> None:
-        self.toc_tree.clear()
-        parent_at_level: dict[int, QTreeWidgetItem] = {}
-        for e in entries:
-            item = QTreeWidgetItem([e.title])
-            item.setData(0, LEVEL_ROLE, e.level)
-            # default checked for H2; H3 default unchecked (settings will override)
-            item.setCheckState(0, Qt.CheckState.Checked if e.level == 2 else Qt.CheckState.Unchecked)
-
-            # place by hierarchy
-            parent = None
-            for lvl in range(e.level - 1, 1, -1):
-                if lvl in parent_at_level:
-                    parent = parent_at_level[lvl]
-                    break
-            if parent is None or e.level <= 2:
-                self.toc_tree.addTopLevelItem(item)
-            else:
-                parent.addChild(item)
-            parent_at_level[e.level] = item
-        self.toc_tree.expandAll()
-
-    def _iter_items_in_order(self, node: QTreeWidgetItem):
-        for i in range(node.childCount()):
-            child = node.child(i)
-            yield child
-            yield from self._iter_items_in_order(child)
+    @contextmanager
+    def _tree_batch(self):
+        """Suspend repaints and item signals while mutating the tree."""
+        tree = self.toc_tree
+        tree.setUpdatesEnabled(False)
+        tree.blockSignals(True)
+        try:
+            yield tree
+        finally:
+            tree.blockSignals(False)
+            tree.setUpdatesEnabled(True)
+            tree.viewport().update()
+
+    def populate_toc(self, entries: list[TOCEntry], slugs: list[str] | None = None) -> None:
+        if slugs is None:
+            slugs = [slugify(e.title) for e in entries]
+        with self._tree_batch() as tree:
+            tree.clear()
+            # parent_at_level[lvl] = latest open item at that level; deeper
+            # slots are cleared on every insert so cousins never adopt
+            parent_at_level: list[QTreeWidgetItem | None] = [None] * 7
+            # enum/role lookups hoisted out of the per-item loop
+            checked, unchecked = Qt.CheckState.Checked, Qt.CheckState.Unchecked
+            level_role, slug_role = LEVEL_ROLE, SLUG_ROLE
+            for e, slug in zip(entries, slugs):
+                lvl = e.level
+                if lvl >= len(parent_at_level):
+                    parent_at_level.extend([None] * (lvl + 1 - len(parent_at_level)))
+                # place by hierarchy (parent passed to the constructor); H2 and
+                # above are always top-level
+                parent = None
+                if lvl > 2:
+                    parent = next((p for p in parent_at_level[lvl - 1:1:-1] if p is not None), None)
+                item = QTreeWidgetItem(parent if parent is not None else tree, [e.title])
+                item.setData(0, level_role, lvl)
+                item.setData(0, slug_role, slug)
+                # default checked for H2; H3 default unchecked (settings will override)
+                item.setCheckState(0, checked if lvl == 2 else unchecked)
+                parent_at_level[lvl] = item
+                parent_at_level[lvl + 1:] = [None] * (len(parent_at_level) - lvl - 1)
+            tree.expandAll()
 
     def collect_checked_entries(self) -> list[TOCEntry]:
         out: list[TOCEntry] = []
-        root = self.toc_tree.invisibleRootItem()
-        # top-level items first (pre-order)
-        for i in range(root.childCount()):
-            node = root.child(i)
-            if node.checkState(0) == Qt.CheckState.Checked:
-                level = int(node.data(0, LEVEL_ROLE) or 2)
-                title = node.text(0)
-                out.append(TOCEntry(level=level, title=title))
-            for child in self._iter_items_in_order(node):
-                if child.checkState(0) == Qt.CheckState.Checked:
-                    level = int(child.data(0, LEVEL_ROLE) or 3)
-                    title = child.text(0)
-                    out.append(TOCEntry(level=level, title=title))
+        # single pre-order pass; Qt filters to checked items in C++
+        it = QTreeWidgetItemIterator(self.toc_tree, QTreeWidgetItemIterator.IteratorFlag.Checked)
+        level_role, entry, append = LEVEL_ROLE, TOCEntry, out.append
+        while (node := it.value()) is not None:
+            # LEVEL_ROLE is always set by populate_toc; parent() only as fallback
+            level = node.data(0, level_role) or (2 if node.parent() is None else 3)
+            append(entry(level=int(level), title=node.text(0)))
+            it += 1
         return out
 
     # ---------- settings ----------
 
     def apply_selections_to_tree(self, settings: dict) -> None:
-        include_by_slug = {s["slug"]: bool(s.get("include", True)) for s in settings.get("selections", [])}
-        root = self.toc_tree.invisibleRootItem()
-        def walk(node: QTreeWidgetItem):
-            for i in range(node.childCount()):
-                child = node.child(i)
-                title = child.text(0)
-                slug = slugify(title)
-                state = Qt.CheckState.Checked if include_by_slug.get(slug, True) else Qt.CheckState.Unchecked
-                child.setCheckState(0, state)
-                walk(child)
-        walk(root)
+        include_by_slug = {s.get("slug"): bool(s.get("include", True)) for s in settings.get("selections", [])}
+        checked, unchecked = Qt.CheckState.Checked, Qt.CheckState.Unchecked
+        slug_role = SLUG_ROLE
+        it = QTreeWidgetItemIterator(self.toc_tree)
+        with self._tree_batch():
+            while (item := it.value()) is not None:
+                slug = item.data(0, slug_role)
+                item.setCheckState(0, checked if include_by_slug.get(slug, True) else unchecked)
+                it += 1
 
     def current_selection_slugs(self) -> list[dict]:
         out = []
-        root = self.toc_tree.invisibleRootItem()
-        def walk(node: QTreeWidgetItem):
-            for i in range(node.childCount()):
-                child = node.child(i)
-                title = child.text(0)
-                slug = slugify(title)
-                include = (child.checkState(0) == Qt.CheckState.Checked)
-                level = int(child.data(0, LEVEL_ROLE) or 2)
-                out.append({"slug": slug, "title": title, "level": level, "include": include})
-                walk(child)
-        walk(root)
+        checked = Qt.CheckState.Checked
+        level_role, slug_role = LEVEL_ROLE, SLUG_ROLE
+        # pre-order via Qt's C++ iterator: no recursion, no generator frames
+        it = QTreeWidgetItemIterator(self.toc_tree)
+        while (item := it.value()) is not None:
+            title = item.text(0)
+            slug = item.data(0, slug_role)
+            include = (item.checkState(0) == checked)
+            level = int(item.data(0, level_role) or 2)
+            out.append({"slug": slug, "title": title, "level": level, "include": include})
+            it += 1
         return out
 
     # ---------- actions ----------
@@ -524,36 +757,47 @@ class StitcherGUI(QMainWindow):
         if not dir_path:
             return
         self.base_dir = Path(dir_path)
+        self.core = None
         self.lbl_dir.setText(str(self.base_dir))
-        self.output.append(f"📁 Selected: {self.base_dir}")
-
-        try:
-            core = TOCStitcherCore(self.base_dir)
-            entries = core.parse_toc()
-            self.populate_toc(entries)
-
-            # Build or reconcile settings from TOC
-            cfg_path = self.base_dir / SETTINGS_FILE
-            existing = load_settings(cfg_path)
-            if existing is None:
-                settings = settings_from_toc(entries)
-                save_settings(cfg_path, settings)
-                self.output.append(f"🆕 Created {cfg_path.name} from TOC.")
-            else:
-                settings = reconcile_settings_with_toc(existing, entries)
-                if settings != existing:
-                    save_settings(cfg_path, settings)
-                    self.output.append(f"🔄 Updated {cfg_path.name} to match current TOC.")
-
-            self.apply_selections_to_tree(settings)
-            self.settings = settings
+        self.output.appendPlainText(f"📁 Selected: {self.base_dir}")
+
+        # TOC parse + settings I/O run in a worker; the tree is filled in
+        # on_loaded. Until then the tree belongs to no project: clear it and
+        # lock every action that would read it or write base_dir's settings.
+        self.is_loading = True
+        self.btn_pick.setEnabled(False)
+        self._set_project_actions_enabled(False)
+        self.toc_tree.clear()
+        self.settings = {}
+        self.loader = LoaderThread(self.base_dir)
+        self.loader.message.connect(self.output.appendPlainText)
+        self.loader.loaded.connect(self.on_loaded)
+        self.loader.failed.connect(self.on_load_failed)
+        self.loader.start()
+
+    def on_loaded(self, entries: list[TOCEntry], settings: dict, slugs: list[str]):
+        self.populate_toc(entries, slugs)
+        self.apply_selections_to_tree(settings)
+        self.settings = settings
 
-            self.btn_build.setEnabled(True)
-            self.btn_save.setEnabled(True)
-            self.btn_open_folder.setEnabled(True)
-            self.btn_metadata.setEnabled(True)
-        except Exception as e:
-            self.output.append(f"❌ Failed to load TOC/settings: {e}")
+        self.is_loading = False
+        self.btn_pick.setEnabled(True)
+        self._set_project_actions_enabled(True)
+
+    def on_load_failed(self, err: str):
+        self.is_loading = False
+        self.btn_pick.setEnabled(True)
+        self.output.appendPlainText(f"❌ Failed to load TOC/settings: {err}")
+
+    def _set_project_actions_enabled(self, enabled: bool) -> None:
+        """Build/Save/Ctrl+S/Metadata/Open Folder act on the loaded project."""
+        self.project_loaded = enabled
+        # at most one build at a time: the core is shared between builds
+        self.btn_build.setEnabled(enabled and not self.is_building)
+        self.btn_save.setEnabled(enabled)
+        self.shortcut_save.setEnabled(enabled)
+        self.btn_open_folder.setEnabled(enabled)
+        self.btn_metadata.setEnabled(enabled)
 
     def open_metadata_editor(self):
         """Open metadata settings dialog"""
@@ -562,47 +806,78 @@ class StitcherGUI(QMainWindow):
         
         dialog = MetadataEditorDialog(self.base_dir, self)
         if dialog.exec():
-            self.output.append("✅ Metadata settings saved")
-            # Reload settings to pick up changes
-            cfg_path = self.base_dir / SETTINGS_FILE
-            self.settings = load_settings(cfg_path) or settings_from_toc([])
+            self.output.appendPlainText("✅ Metadata settings saved")
+            # The dialog holds exactly what it just wrote; no need to re-read it
+            saved = dialog.settings
+            self.settings = saved if isinstance(saved, dict) and saved else settings_from_toc([])
 
     def start_build(self):
         if not self.base_dir:
-            self.output.append("⚠️ Pick a working directory first.")
+            self.output.appendPlainText("⚠️ Pick a working directory first.")
+            return
+        if self.is_building or self.is_loading:
             return
         selected_entries = self.collect_checked_entries()
         if not selected_entries:
-            self.output.append("⚠️ No sections selected.")
+            self.output.appendPlainText("⚠️ No sections selected.")
             return
-        self.output.append("🚀 Starting build…")
-        self.thread = BuilderThread(self.base_dir, selected_entries, export_pdf=True)
-        self.thread.message.connect(self.output.append)
-        self.thread.finished.connect(self.on_finished)
-        self.thread.start()
+        self.output.appendPlainText("🚀 Starting build…")
+        if self.core is None:
+            # settings are loaded by the task's refresh(), off the GUI thread
+            self.core = TOCStitcherCore(self.base_dir, load=False)
+        # one build at a time: the core instance is shared between builds
+        self.is_building = True
+        self.btn_build.setEnabled(False)
+        self.build_task = BuilderTask(self.core, selected_entries, export_pdf=True)
+        self.build_task.message.connect(self.append_log_batch)
+        # the project may be re-picked mid-build; remember whose build this is
+        self.build_dir = self.base_dir
+        self.build_task.finished.connect(self.on_finished)
+        QThreadPool.globalInstance().start(self.build_task)
 
     def save_project_settings(self):
         if not self.base_dir:
-            self.output.append("⚠️ Pick a working directory first.")
+            self.output.appendPlainText("⚠️ Pick a working directory first.")
+            return
+        if self.is_loading:
+            # tree is empty until on_loaded; saving now would wipe selections
             return
         cfg_path = self.base_dir / SETTINGS_FILE
-        existing = load_settings(cfg_path) or settings_from_toc([])
-        existing["selections"] = self.current_selection_slugs()
+        loaded = load_settings(cfg_path)
+        existing = loaded or settings_from_toc([])
+        selections = self.current_selection_slugs()
+        changed = loaded is None or existing.get("selections") != selections
+        existing["selections"] = selections
         # keep existing metadata/output blocks if present
-        existing.setdefault("metadata", settings_from_toc([])["metadata"])
-        existing.setdefault("output", settings_from_toc([])["output"])
-        existing.setdefault("toc", {"place": "by_toc"})
+        for key, default in (("metadata", _DEFAULT_METADATA),
+                             ("output", _DEFAULT_OUTPUT),
+                             ("toc", _DEFAULT_TOC)):
+            if key not in existing:
+                existing[key] = dict(default)
+                changed = True
+        if not changed:
+            # also the common case after a build: skip rewriting an identical file
+            self.output.appendPlainText(f"💾 Project settings already up to date → {cfg_path}")
+            return
         save_settings(cfg_path, existing)
-        self.output.append(f"💾 Saved project settings → {cfg_path}")
+        self.output.appendPlainText(f"💾 Saved project settings → {cfg_path}")
+
+    def append_log_batch(self, lines: list[str]):
+        self.output.appendPlainText("\n".join(lines))
 
     def on_finished(self, ok: bool):
-        if ok and self.base_dir:
+        self.is_building = False
+        self.btn_build.setEnabled(self.project_loaded)
+        # persist selections only if the tree still shows the built project
+        if ok and self.project_loaded and self.build_dir == self.base_dir:
             self.save_project_settings()
 
     def open_output_folder(self):
         if self.base_dir and self.base_dir.exists():
+            from PyQt6.QtCore import QUrl
+            from PyQt6.QtGui import QDesktopServices
             QDesktopServices.openUrl(QUrl.fromLocalFile(str(self.base_dir)))
-            self.output.append(f"📂 Opened: {self.base_dir}")
+            self.output.appendPlainText(f"📂 Opened: {self.base_dir}")
 
 
 if __name__ == "__main__":